@@ -0,0 +1,130 @@
+"""
+Benchmark de inicialização da API.
+
+Mede, para uma planilha CSV e uma XLSX:
+- o tempo de import de `main` (python -X importtime), e se pandas foi carregado
+- o tempo desde o início do processo uvicorn até a primeira resposta de /cotas
+
+Uso:
+    python benchmark_startup.py
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+# Planilhas comparadas (caminhos relativos a backend/)
+PLANILHAS = ["../dados/cotas_exemplo.csv", "cotas.xlsx"]
+
+# Número de execuções por planilha (é reportada a mediana)
+REPETICOES = 5
+
+# Tempo máximo esperando a primeira resposta (em segundos)
+TIMEOUT_SEGUNDOS = 30
+
+
+def ambiente(planilha: str, diretorio_temp: str) -> dict:
+    """Variáveis de ambiente que isolam o benchmark dos arquivos do projeto."""
+    env = dict(os.environ)
+    env["ARQUIVO_PLANILHA"] = planilha
+    env["STORAGE_BACKEND"] = "memoria"
+    env["ARQUIVO_JOURNAL"] = str(Path(diretorio_temp) / "cotas_status.journal")
+    return env
+
+
+def medir_import(planilha: str, diretorio_temp: str) -> tuple[float, dict]:
+    """
+    Importa `main` com -X importtime e lê a planilha uma vez.
+
+    Returns:
+        Tupla (ms cumulativos do import de main, {pacote: ms} dos pacotes pesados
+        importados durante o import ou a leitura)
+    """
+    codigo = "import main; main.ler_planilha()"
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=BACKEND_DIR,
+        env=ambiente(planilha, diretorio_temp),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    tempos = {}
+    for linha in resultado.stderr.splitlines():
+        # Formato: "import time:  self [us] | cumulative | imported package"
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", linha)
+        if match:
+            tempos[match.group(3)] = int(match.group(1)) / 1000
+
+    pesados = {pacote: tempos[pacote] for pacote in ["pandas", "openpyxl", "fastapi"] if pacote in tempos}
+    return tempos.get("main", 0.0), pesados
+
+
+def porta_livre() -> int:
+    """Reserva uma porta TCP livre em localhost."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_primeira_resposta(planilha: str, diretorio_temp: str) -> float:
+    """Inicia o uvicorn e mede o tempo até o primeiro 200 em /cotas (em ms)."""
+    porta = porta_livre()
+    url = f"http://127.0.0.1:{porta}/cotas"
+
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=ambiente(planilha, diretorio_temp),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        while time.perf_counter() - inicio < TIMEOUT_SEGUNDOS:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return (time.perf_counter() - inicio) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError(f"Sem resposta de {url} em {TIMEOUT_SEGUNDOS}s")
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def mediana(valores: list) -> float:
+    valores = sorted(valores)
+    return valores[len(valores) // 2]
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("⏱️  Benchmark de inicialização - Carta Contemplada API")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as diretorio_temp:
+        for planilha in PLANILHAS:
+            imports = [medir_import(planilha, diretorio_temp) for _ in range(REPETICOES)]
+            respostas = [medir_primeira_resposta(planilha, diretorio_temp) for _ in range(REPETICOES)]
+
+            print(f"\n📄 {planilha}")
+            print(f"  import main:            {mediana([t for t, _ in imports]):8.1f} ms (cumulativo)")
+            for pacote, ms in imports[-1][1].items():
+                print(f"    └─ {pacote:<20} {ms:8.1f} ms")
+            if "pandas" not in imports[-1][1]:
+                print("    └─ pandas não carregado")
+            print(f"  primeira resposta /cotas: {mediana(respostas):6.1f} ms (desde o início do processo)")
+
+    print("=" * 70)
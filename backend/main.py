@@ -8,15 +8,28 @@ Arquitetura:
 - Backend Python apenas LÊ e valida os dados
 - Frontend consome a API e renderiza dinamicamente
 - Cache simples para otimizar leituras frequentes
+
+pandas/openpyxl só são importados quando uma planilha .xlsx precisa ser lida;
+arquivos .csv são lidos com o módulo csv da biblioteca padrão.
 """
 
+import asyncio
+import codecs
+import csv
+import io
+import json
+import math
 import os
+import queue
+import secrets
+import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, validator
 
@@ -25,7 +38,7 @@ from pydantic import BaseModel, validator
 # ============================================================================
 
 # Caminho do arquivo de dados (Excel ou CSV)
-ARQUIVO_PLANILHA = Path(__file__).parent / "cotas.xlsx"  # Mude para .csv se necessário
+ARQUIVO_PLANILHA = Path(__file__).parent / os.getenv("ARQUIVO_PLANILHA", "cotas.xlsx")  # Mude para .csv se necessário
 
 # Configuração de cache (em segundos)
 CACHE_DURATION_SECONDS = 60
@@ -33,6 +46,41 @@ CACHE_DURATION_SECONDS = 60
 # Colunas obrigatórias na planilha
 COLUNAS_OBRIGATORIAS = ["id", "tipo", "credito", "parcela", "entrada", "status", "administradora", "grupo"]
 
+# Colunas numéricas, convertidas na leitura de CSV
+COLUNAS_NUMERICAS = ["credito", "parcela", "entrada"]
+
+# Textos tratados como célula vazia na leitura de CSV (os mesmos do pd.read_csv)
+VALORES_VAZIOS_CSV = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+# Valores permitidos na coluna status
+STATUS_PERMITIDOS = ["disponivel", "vendida"]
+
+# Journal das atualizações de status ainda não gravadas na planilha
+ARQUIVO_JOURNAL = Path(os.getenv("ARQUIVO_JOURNAL", Path(__file__).parent / "cotas_status.journal"))
+
+# Intervalo entre gravações do journal na planilha (em segundos)
+WRITEBACK_INTERVAL_SECONDS = 5
+
+# Token exigido no header X-API-Token pelos endpoints de escrita.
+# Sem ele, PATCH /cotas/status fica desabilitado.
+API_TOKEN = os.getenv("API_TOKEN") or None
+
+# Backend de armazenamento: "memoria" (cache em memória) ou "sqlite" (banco local indexado)
+STORAGE_BACKENDS = ["memoria", "sqlite"]
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memoria").strip().lower()
+
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    raise ValueError(f"STORAGE_BACKEND inválido: {STORAGE_BACKEND!r}. Permitido: {STORAGE_BACKENDS}")
+
+# Arquivo do banco SQLite (usado apenas com STORAGE_BACKEND=sqlite)
+ARQUIVO_SQLITE = Path(os.getenv("ARQUIVO_SQLITE", Path(__file__).parent / "cotas.db"))
+
+# Número de conexões mantidas no pool do SQLite
+SQLITE_POOL_SIZE = 4
+
 # ============================================================================
 # MODELS (Pydantic)
 # ============================================================================
@@ -68,6 +116,32 @@ class ResponseCotas(BaseModel):
     cotas: List[Cota]
     timestamp: str
 
+class AtualizacaoStatus(BaseModel):
+    """Atualização de status de uma cota."""
+    id: str
+    status: str
+
+    @validator("id")
+    def id_nao_vazio(cls, v):
+        v = v.strip()
+        if not v:
+            raise ValueError("ID não pode estar vazio")
+        return v
+
+    @validator("status")
+    def status_permitido(cls, v):
+        v = v.strip().lower()
+        if v not in STATUS_PERMITIDOS:
+            raise ValueError(f"Status inválido: {v}. Permitido: {STATUS_PERMITIDOS}")
+        return v
+
+class ResponseAtualizacaoStatus(BaseModel):
+    """Resposta da atualização de status em lote."""
+    atualizadas: int
+    nao_encontradas: List[str]
+    pendentes_gravacao: int
+    timestamp: str
+
 # ============================================================================
 # CACHE SIMPLES
 # ============================================================================
@@ -79,6 +153,7 @@ class CacheManager:
         self.duration_seconds = duration_seconds
         self.file_path = file_path
         self.data = None
+        self.indice = {}
         self.last_update = None
         self.file_mtime = None
     
@@ -107,6 +182,9 @@ class CacheManager:
     def set(self, data):
         """Armazena dados no cache."""
         self.data = data
+        self.indice = {}
+        for cota in data:
+            self.indice.setdefault(cota.id, []).append(cota)
         self.last_update = datetime.now()
         if self.file_path:
             try:
@@ -117,6 +195,7 @@ class CacheManager:
     def clear(self):
         """Limpa o cache."""
         self.data = None
+        self.indice = {}
         self.last_update = None
         self.file_mtime = None
 
@@ -124,17 +203,37 @@ class CacheManager:
 # FUNÇÕES DE LEITURA E VALIDAÇÃO
 # ============================================================================
 
-def validar_colunas(df: pd.DataFrame) -> None:
+def _vazio(valor: Any) -> bool:
+    """Equivalente a pd.isna para os valores lidos da planilha (None ou NaN)."""
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+def _texto(valor: Any) -> str:
+    """Converte um valor da planilha em texto, usando "" para células vazias."""
+    return "" if _vazio(valor) else str(valor).strip()
+
+def normalizar_id(valor: Any) -> str:
     """
-    Valida se o DataFrame contém todas as colunas obrigatórias.
+    Converte o ID lido da planilha em texto.
+    
+    IDs numéricos inteiros viram "1" tanto quando lidos como int quanto como
+    float (o pandas lê 1.0 se a coluna tiver células vazias), para que a
+    leitura e a gravação na planilha usem o mesmo ID.
+    """
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+def validar_colunas(colunas: List[str]) -> None:
+    """
+    Valida se a planilha contém todas as colunas obrigatórias.
     
     Args:
-        df: DataFrame do pandas
+        colunas: Nomes das colunas do cabeçalho
         
     Raises:
         ValueError: Se faltarem colunas obrigatórias
     """
-    colunas_faltantes = set(COLUNAS_OBRIGATORIAS) - set(df.columns)
+    colunas_faltantes = set(COLUNAS_OBRIGATORIAS) - set(colunas)
     
     if colunas_faltantes:
         raise ValueError(
@@ -142,27 +241,26 @@ def validar_colunas(df: pd.DataFrame) -> None:
             f"Colunas esperadas: {COLUNAS_OBRIGATORIAS}"
         )
 
-def validar_dados_linha(row: pd.Series) -> tuple[bool, Optional[str]]:
+def validar_dados_linha(row: Dict[str, Any]) -> tuple[bool, Optional[str]]:
     """
     Valida uma linha de dados da planilha.
     
     Args:
-        row: Linha do DataFrame
+        row: Linha da planilha (coluna -> valor)
         
     Returns:
         Tupla (é_válido, mensagem_erro)
     """
     # Validar campos obrigatórios não vazios
-    if pd.isna(row["id"]) or str(row["id"]).strip() == "":
+    if _vazio(row["id"]) or str(row["id"]).strip() == "":
         return False, f"ID não pode estar vazio"
     
-    if pd.isna(row["status"]):
+    if _vazio(row["status"]):
         return False, f"Status obrigatório para cota {row['id']}"
     
     # Validar status permitido
-    status_permitidos = ["disponivel", "vendida"]
-    if str(row["status"]).strip().lower() not in status_permitidos:
-        return False, f"Status inválido para {row['id']}: {row['status']}. Permitido: {status_permitidos}"
+    if str(row["status"]).strip().lower() not in STATUS_PERMITIDOS:
+        return False, f"Status inválido para {row['id']}: {row['status']}. Permitido: {STATUS_PERMITIDOS}"
     
     # Validar tipos numéricos
     try:
@@ -174,6 +272,43 @@ def validar_dados_linha(row: pd.Series) -> tuple[bool, Optional[str]]:
     
     return True, None
 
+def _converter_numero(valor: Optional[str]) -> Any:
+    """Converte texto numérico em float; outros valores seguem para a validação."""
+    if valor is None:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        return valor
+
+def _ler_linhas_csv() -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Lê a planilha CSV com o módulo csv, sem pandas.
+    
+    Células vazias (ou com um dos VALORES_VAZIOS_CSV) viram None e as
+    colunas numéricas viram float, como na leitura do pandas.
+    """
+    with open(ARQUIVO_PLANILHA, newline="", encoding="utf-8-sig") as f:
+        leitor = csv.DictReader(f)
+        colunas = list(leitor.fieldnames or [])
+        linhas = []
+        
+        for linha in leitor:
+            row = {coluna: (None if valor in VALORES_VAZIOS_CSV else valor) for coluna, valor in linha.items()}
+            for coluna in COLUNAS_NUMERICAS:
+                if coluna in row:
+                    row[coluna] = _converter_numero(row[coluna])
+            linhas.append(row)
+    
+    return colunas, linhas
+
+def _ler_linhas_xlsx() -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Lê a planilha XLSX com pandas (importado apenas aqui)."""
+    import pandas as pd
+    
+    df = pd.read_excel(ARQUIVO_PLANILHA)
+    return [str(coluna) for coluna in df.columns], df.to_dict("records")
+
 def ler_planilha() -> List[Cota]:
     """
     Lê a planilha de cotas (Excel ou CSV) e retorna lista de cotas válidas.
@@ -195,24 +330,24 @@ def ler_planilha() -> List[Cota]:
     # Detectar tipo de arquivo e ler
     try:
         if str(ARQUIVO_PLANILHA).endswith('.xlsx'):
-            df = pd.read_excel(ARQUIVO_PLANILHA)
+            colunas, linhas = _ler_linhas_xlsx()
         elif str(ARQUIVO_PLANILHA).endswith('.csv'):
-            df = pd.read_csv(ARQUIVO_PLANILHA)
+            colunas, linhas = _ler_linhas_csv()
         else:
             raise ValueError("Arquivo deve ser .xlsx ou .csv")
     except Exception as e:
         raise ValueError(f"Erro ao ler planilha: {str(e)}")
     
     # Validar colunas
-    validar_colunas(df)
+    validar_colunas(colunas)
     
     # Processar e validar linhas
     cotas = []
     erros = []
     
-    for idx, row in df.iterrows():
+    for idx, row in enumerate(linhas):
         # Pular linhas vazias
-        if pd.isna(row["id"]):
+        if _vazio(row["id"]):
             continue
         
         # Validar dados
@@ -224,14 +359,14 @@ def ler_planilha() -> List[Cota]:
         # Criar objeto Cota
         try:
             cota = Cota(
-                id=str(row["id"]).strip(),
-                tipo=str(row["tipo"]).strip() if not pd.isna(row["tipo"]) else "",
+                id=normalizar_id(row["id"]),
+                tipo=_texto(row["tipo"]),
                 credito=float(row["credito"]),
                 parcela=int(float(row["parcela"])),
                 entrada=float(row["entrada"]),
                 status=str(row["status"]).strip().lower(),
-                administradora=str(row["administradora"]).strip() if not pd.isna(row["administradora"]) else "",
-                grupo=str(row["grupo"]).strip() if not pd.isna(row["grupo"]) else ""
+                administradora=_texto(row["administradora"]),
+                grupo=_texto(row["grupo"])
             )
             cotas.append(cota)
         except Exception as e:
@@ -246,14 +381,526 @@ def ler_planilha() -> List[Cota]:
     print(f"✅ Lidas {len(cotas)} cotas válidas da planilha")
     return cotas
 
+def carregar_cotas() -> List[Cota]:
+    """Lê a planilha e aplica as atualizações de status ainda não gravadas nela."""
+    cotas = ler_planilha()
+    journal.aplicar(cotas)
+    return cotas
+
+def planilha_mtime() -> Optional[float]:
+    """Retorna a data de modificação da planilha, ou None se ela não existir."""
+    try:
+        return ARQUIVO_PLANILHA.stat().st_mtime
+    except (OSError, FileNotFoundError):
+        return None
+
+# ============================================================================
+# ARMAZENAMENTO SQLITE
+# ============================================================================
+
+class SQLiteStorage:
+    """
+    Armazenamento das cotas em um arquivo SQLite local com índices.
+    
+    A planilha continua sendo a fonte de verdade: o banco é uma cópia
+    indexada, substituída por inteiro a cada nova leitura da planilha.
+    O modo WAL permite que as consultas continuem lendo a versão anterior
+    enquanto uma recarga está em andamento.
+    """
+    
+    def __init__(self, db_path: Path, pool_size: int = 4):
+        self.db_path = db_path
+        self.pool = queue.Queue(maxsize=pool_size)
+        self.recarga_lock = threading.Lock()
+        
+        for _ in range(pool_size):
+            self.pool.put(self._conectar())
+        
+        self._criar_schema()
+        self.origem_mtime = self._ler_metadado("origem_mtime", float)
+        self.last_update = self._ler_metadado("atualizado_em", datetime.fromisoformat)
+    
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre uma conexão configurada para leitura concorrente (WAL)."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool durante o bloco `with`."""
+        conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+    
+    def _criar_schema(self):
+        """Cria a tabela de cotas, os índices e a tabela de metadados."""
+        with self.conexao() as conn, conn:
+            # `ordem` preserva a ordem das linhas da planilha
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cotas (
+                    ordem INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    credito REAL NOT NULL,
+                    parcela INTEGER NOT NULL,
+                    entrada REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    administradora TEXT NOT NULL,
+                    grupo TEXT NOT NULL
+                )
+            """)
+            for coluna in ["id", "status", "tipo", "administradora", "credito"]:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_cotas_{coluna} ON cotas ({coluna})")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadados (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT
+                )
+            """)
+    
+    def _ler_metadado(self, chave: str, conversor):
+        """Lê um valor da tabela de metadados, ou None se ausente."""
+        with self.conexao() as conn:
+            row = conn.execute("SELECT valor FROM metadados WHERE chave = ?", (chave,)).fetchone()
+        return conversor(row["valor"]) if row else None
+    
+    def carregado(self) -> bool:
+        """Indica se o banco já recebeu ao menos uma carga da planilha."""
+        return self.origem_mtime is not None
+    
+    def carregar(self, cotas: List[Cota], origem_mtime: Optional[float]):
+        """
+        Substitui todas as cotas do banco em uma única transação.
+        
+        Args:
+            cotas: Lista de cotas lida da planilha
+            origem_mtime: Data de modificação da planilha lida
+        """
+        agora = datetime.now()
+        linhas = [
+            (c.id, c.tipo, c.credito, c.parcela, c.entrada, c.status, c.administradora, c.grupo)
+            for c in cotas
+        ]
+        
+        with self.conexao() as conn, conn:
+            conn.execute("DELETE FROM cotas")
+            conn.executemany(
+                f"INSERT INTO cotas ({', '.join(COLUNAS_OBRIGATORIAS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                linhas
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO metadados (chave, valor) VALUES (?, ?)",
+                [("origem_mtime", repr(origem_mtime or 0.0)), ("atualizado_em", agora.isoformat())]
+            )
+        
+        self.origem_mtime = origem_mtime or 0.0
+        self.last_update = agora
+    
+    def listar(self, status: Optional[str] = None) -> List[Cota]:
+        """Retorna as cotas na ordem da planilha, opcionalmente filtradas por status."""
+        sql = f"SELECT {', '.join(COLUNAS_OBRIGATORIAS)} FROM cotas"
+        params = ()
+        if status is not None:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY ordem"
+        
+        with self.conexao() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [Cota(**dict(row)) for row in rows]
+    
+    def buscar(self, cota_id: str) -> Optional[Cota]:
+        """Retorna a primeira cota com o ID informado, ou None."""
+        with self.conexao() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLUNAS_OBRIGATORIAS)} FROM cotas WHERE id = ? ORDER BY ordem LIMIT 1",
+                (cota_id,)
+            ).fetchone()
+        return Cota(**dict(row)) if row else None
+    
+    def total(self) -> int:
+        """Retorna o número de cotas armazenadas."""
+        with self.conexao() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cotas").fetchone()[0]
+    
+    def existentes(self, ids: List[str]) -> set:
+        """Retorna o subconjunto de IDs que existem no banco."""
+        with self.conexao() as conn:
+            return {
+                cota_id for cota_id in ids
+                if conn.execute("SELECT 1 FROM cotas WHERE id = ? LIMIT 1", (cota_id,)).fetchone()
+            }
+    
+    def atualizar_status(self, atualizacoes: Dict[str, str]):
+        """Aplica atualizações de status (id -> status) em uma única transação."""
+        with self.conexao() as conn, conn:
+            conn.executemany(
+                "UPDATE cotas SET status = ? WHERE id = ?",
+                [(status, cota_id) for cota_id, status in atualizacoes.items()]
+            )
+    
+    def marcar_origem(self, origem_mtime: float):
+        """Registra que o banco corresponde à planilha com a data de modificação informada."""
+        with self.conexao() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO metadados (chave, valor) VALUES (?, ?)",
+                ("origem_mtime", repr(origem_mtime))
+            )
+        self.origem_mtime = origem_mtime
+
+def sincronizar_sqlite(forcar: bool = False) -> bool:
+    """
+    Relê a planilha e recarrega o banco se ela mudou desde a última carga.
+    
+    Args:
+        forcar: Recarrega mesmo que a planilha não tenha mudado
+        
+    Returns:
+        True se o banco foi recarregado
+    """
+    with storage.recarga_lock:
+        mtime = planilha_mtime()
+        if not forcar and storage.carregado() and mtime == storage.origem_mtime:
+            return False
+        
+        # mtime é lido antes da planilha: uma edição durante a leitura
+        # será detectada na próxima verificação
+        cotas = carregar_cotas()
+        storage.carregar(cotas, mtime)
+        
+        # Reaplica o journal: atualizações recebidas durante a leitura
+        # da planilha não estavam na lista carregada acima
+        storage.atualizar_status(journal.snapshot())
+        return True
+
+def recarregar_sqlite_em_background(forcar: bool = False) -> bool:
+    """
+    Dispara a sincronização em uma thread, se nenhuma estiver em andamento.
+    
+    Args:
+        forcar: Recarrega mesmo que a planilha não tenha mudado
+        
+    Returns:
+        True se uma nova recarga foi iniciada
+    """
+    if storage.recarga_lock.locked():
+        return False
+    
+    def _executar():
+        try:
+            sincronizar_sqlite(forcar=forcar)
+        except Exception as e:
+            print(f"❌ ERRO na recarga em background: {str(e)}")
+    
+    threading.Thread(target=_executar, name="recarga-sqlite", daemon=True).start()
+    return True
+
+def garantir_sqlite_atualizado():
+    """
+    Garante que o banco possa responder consultas.
+    
+    Na primeira carga a leitura é síncrona; depois disso, mudanças na planilha
+    disparam uma recarga em background e as consultas seguem respondendo com
+    os dados anteriores até ela terminar.
+    """
+    if not storage.carregado():
+        sincronizar_sqlite()
+        return
+    
+    mtime = planilha_mtime()
+    if mtime is not None and mtime != storage.origem_mtime:
+        recarregar_sqlite_em_background()
+
+# ============================================================================
+# JOURNAL DE STATUS E GRAVAÇÃO NA PLANILHA
+# ============================================================================
+
+class StatusJournal:
+    """
+    Journal append-only das atualizações de status.
+    
+    Cada atualização é gravada (com fsync) antes de ser confirmada ao cliente.
+    As entradas são consolidadas por ID (a última vence) e mantidas até serem
+    gravadas na planilha; ao reiniciar, o journal existente é relido.
+    """
+    
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        self.pendentes: Dict[str, str] = {}
+        self._carregar()
+    
+    def _carregar(self):
+        """Relê o journal do disco, ignorando linhas incompletas."""
+        if not self.file_path.exists():
+            return
+        
+        with open(self.file_path, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                    self.pendentes[entrada["id"]] = entrada["status"]
+                except (ValueError, KeyError, TypeError):
+                    # Linha truncada (ex.: queda durante a escrita)
+                    continue
+    
+    def registrar(self, atualizacoes: Dict[str, str]):
+        """Anexa atualizações (id -> status) ao journal de forma durável."""
+        agora = datetime.now().isoformat()
+        
+        with self.lock:
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                for cota_id, status in atualizacoes.items():
+                    f.write(json.dumps({"id": cota_id, "status": status, "em": agora}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.pendentes.update(atualizacoes)
+    
+    def snapshot(self) -> Dict[str, str]:
+        """Retorna uma cópia das atualizações pendentes, consolidadas por ID."""
+        with self.lock:
+            return dict(self.pendentes)
+    
+    def aplicar(self, cotas: List[Cota]):
+        """Aplica as atualizações pendentes sobre uma lista de cotas lida da planilha."""
+        pendentes = self.snapshot()
+        if not pendentes:
+            return
+        
+        for cota in cotas:
+            if cota.id in pendentes:
+                cota.status = pendentes[cota.id]
+    
+    def confirmar(self, gravadas: Dict[str, str]):
+        """
+        Remove do journal as atualizações já gravadas na planilha.
+        
+        Atualizações mais novas para o mesmo ID são mantidas. O journal é
+        reescrito apenas com o que continua pendente.
+        """
+        with self.lock:
+            for cota_id, status in gravadas.items():
+                if self.pendentes.get(cota_id) == status:
+                    del self.pendentes[cota_id]
+            
+            temporario = self.file_path.with_name(self.file_path.name + ".tmp")
+            with open(temporario, "w", encoding="utf-8") as f:
+                for cota_id, status in self.pendentes.items():
+                    f.write(json.dumps({"id": cota_id, "status": status}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.file_path)
+
+def _gravar_status_csv(arquivo_destino: Path, atualizacoes: Dict[str, str]) -> set:
+    """
+    Copia a planilha CSV para `arquivo_destino` com os status atualizados.
+    
+    O BOM (se houver) e a quebra de linha do arquivo original são mantidos,
+    para o Excel continuar abrindo o arquivo com os acentos corretos.
+    
+    Returns:
+        IDs que tiveram ao menos uma linha alterada
+    """
+    with open(ARQUIVO_PLANILHA, "rb") as f:
+        bruto = f.read()
+    
+    com_bom = bruto.startswith(codecs.BOM_UTF8)
+    texto = bruto.decode("utf-8-sig")
+    quebra_linha = "\r\n" if "\r\n" in texto else "\n"
+    linhas = list(csv.reader(io.StringIO(texto, newline="")))
+    
+    cabecalho = linhas[0]
+    idx_id, idx_status = cabecalho.index("id"), cabecalho.index("status")
+    gravadas = set()
+    
+    for linha in linhas[1:]:
+        if len(linha) <= max(idx_id, idx_status):
+            continue
+        cota_id = normalizar_id(linha[idx_id])
+        status = atualizacoes.get(cota_id)
+        if status is not None:
+            linha[idx_status] = status
+            gravadas.add(cota_id)
+    
+    with open(arquivo_destino, "w", newline="", encoding="utf-8-sig" if com_bom else "utf-8") as f:
+        csv.writer(f, lineterminator=quebra_linha).writerows(linhas)
+    return gravadas
+
+def _gravar_status_xlsx(arquivo_destino: Path, atualizacoes: Dict[str, str]) -> set:
+    """
+    Copia a planilha XLSX para `arquivo_destino` com os status atualizados.
+    
+    Planilhas com fórmulas não são regravadas: o openpyxl salva as fórmulas
+    sem os valores calculados, e o pandas passaria a ler essas células como
+    vazias (NaN) até o arquivo ser aberto e salvo de novo no Excel.
+    
+    Returns:
+        IDs que tiveram ao menos uma linha alterada
+        
+    Raises:
+        ValueError: Se alguma aba da planilha contiver fórmulas
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(ARQUIVO_PLANILHA)
+    
+    for aba in workbook.worksheets:
+        for linha in aba.iter_rows():
+            for celula in linha:
+                if celula.data_type == "f":
+                    raise ValueError(
+                        f"Planilha contém fórmulas (aba '{aba.title}', célula {celula.coordinate}); "
+                        f"a gravação automática de status foi suspensa para não apagar os valores "
+                        f"calculados. As atualizações seguem no journal ({ARQUIVO_JOURNAL}). "
+                        f"Use uma planilha sem fórmulas (ou CSV) para habilitar a gravação."
+                    )
+    
+    # Mesma aba lida por ler_planilha (a primeira); a formatação é preservada
+    planilha = workbook.worksheets[0]
+    
+    cabecalho = [celula.value for celula in planilha[1]]
+    idx_id, idx_status = cabecalho.index("id"), cabecalho.index("status")
+    gravadas = set()
+    
+    for linha in planilha.iter_rows(min_row=2):
+        valor_id = linha[idx_id].value
+        if valor_id is None:
+            continue
+        cota_id = normalizar_id(valor_id)
+        status = atualizacoes.get(cota_id)
+        if status is not None:
+            linha[idx_status].value = status
+            gravadas.add(cota_id)
+    
+    workbook.save(arquivo_destino)
+    return gravadas
+
+# Serializa gravações na planilha (loop de background e desligamento)
+writeback_lock = threading.Lock()
+
+# (mtime da planilha, pendentes) da última tentativa que não gravou nada,
+# para não reler a planilha a cada ciclo enquanto nada mudar
+_tentativa_sem_efeito = None
+
+def gravar_status_pendentes() -> int:
+    """
+    Grava na planilha, em uma única passada, todas as atualizações pendentes.
+    
+    A planilha é reescrita em um arquivo temporário e substituída de forma
+    atômica. Só saem do journal os IDs encontrados na planilha; se ela for
+    editada durante a gravação, o ciclo é descartado e tentado de novo.
+    Em caso de erro, o journal é mantido para a próxima tentativa.
+    
+    Returns:
+        Número de IDs gravados na planilha
+    """
+    global _tentativa_sem_efeito
+    
+    with writeback_lock:
+        pendentes = journal.snapshot()
+        if not pendentes:
+            return 0
+        
+        mtime_antes = planilha_mtime()
+        if _tentativa_sem_efeito == (mtime_antes, pendentes):
+            return 0
+        
+        temporario = ARQUIVO_PLANILHA.with_name(f".{ARQUIVO_PLANILHA.stem}.tmp{ARQUIVO_PLANILHA.suffix}")
+        
+        try:
+            if ARQUIVO_PLANILHA.suffix == ".xlsx":
+                gravadas = _gravar_status_xlsx(temporario, pendentes)
+            elif ARQUIVO_PLANILHA.suffix == ".csv":
+                gravadas = _gravar_status_csv(temporario, pendentes)
+            else:
+                raise ValueError("Arquivo deve ser .xlsx ou .csv")
+        except ValueError:
+            # Planilha que não pode ser gravada (ex.: com fórmulas): só tenta
+            # de novo quando ela ou as atualizações pendentes mudarem
+            _tentativa_sem_efeito = (mtime_antes, pendentes)
+            raise
+        
+        nao_encontradas = sorted(set(pendentes) - gravadas)
+        if nao_encontradas:
+            print(f"⚠️  IDs pendentes não encontrados na planilha (mantidos no journal): {nao_encontradas}")
+        
+        if not gravadas:
+            temporario.unlink()
+            _tentativa_sem_efeito = (mtime_antes, pendentes)
+            return 0
+        
+        # Edição manual durante a leitura/gravação: não sobrescrever
+        if planilha_mtime() != mtime_antes:
+            temporario.unlink()
+            print("⚠️  Planilha alterada durante a gravação de status; nova tentativa no próximo ciclo")
+            return 0
+        
+        os.replace(temporario, ARQUIVO_PLANILHA)
+        journal.confirmar({cota_id: pendentes[cota_id] for cota_id in gravadas})
+        
+        # Os dados já carregados incluem estas atualizações: evita reler a
+        # planilha só porque ela foi reescrita por nós
+        mtime_depois = planilha_mtime()
+        if mtime_antes is not None and mtime_depois is not None:
+            if cache.file_mtime == mtime_antes:
+                cache.file_mtime = mtime_depois
+            if storage is not None and storage.origem_mtime == mtime_antes:
+                storage.marcar_origem(mtime_depois)
+        
+        print(f"💾 {len(gravadas)} atualizações de status gravadas na planilha")
+        return len(gravadas)
+
+async def loop_gravacao_status():
+    """Grava periodicamente o journal na planilha, fora do event loop."""
+    while True:
+        await asyncio.sleep(WRITEBACK_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(gravar_status_pendentes)
+        except Exception as e:
+            print(f"❌ ERRO ao gravar status na planilha: {str(e)}")
+
 # ============================================================================
 # APLICAÇÃO FastAPI
 # ============================================================================
 
+# Inicializar armazenamento SQLite (apenas se configurado)
+storage = SQLiteStorage(ARQUIVO_SQLITE, SQLITE_POOL_SIZE) if STORAGE_BACKEND == "sqlite" else None
+
+# Inicializar journal de status (relê atualizações ainda não gravadas)
+journal = StatusJournal(ARQUIVO_JOURNAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Com SQLite, serve o banco existente e recarrega a planilha em background.
+    Mantém a gravação periódica do journal de status na planilha.
+    """
+    if storage is not None and planilha_mtime() is not None:
+        recarregar_sqlite_em_background()
+    elif storage is None and cache.data is None and planilha_mtime() is not None:
+        # Deixa o catálogo pronto para o PATCH, que nunca lê a planilha
+        carregar_cache_em_background()
+    
+    tarefa_gravacao = asyncio.create_task(loop_gravacao_status())
+    yield
+    tarefa_gravacao.cancel()
+    
+    # Última gravação antes de desligar; o que falhar continua no journal
+    try:
+        await asyncio.to_thread(gravar_status_pendentes)
+    except Exception as e:
+        print(f"❌ ERRO ao gravar status na planilha: {str(e)}")
+
 app = FastAPI(
     title="Carta Contemplada API",
     description="API para consulta de cotas contempladas (CMS baseado em planilha)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS - permitir requisições do frontend
@@ -268,6 +915,59 @@ app.add_middleware(
 # Inicializar cache
 cache = CacheManager(duration_seconds=CACHE_DURATION_SECONDS, file_path=ARQUIVO_PLANILHA)
 
+# Serializa journal + aplicação das atualizações de status e a troca do
+# cache em memória (os endpoints rodam no threadpool)
+atualizacao_lock = threading.Lock()
+
+# Evita duas cargas do cache em memória em background ao mesmo tempo
+cache_recarga_lock = threading.Lock()
+
+def recarregar_cache() -> List[Cota]:
+    """
+    Relê a planilha e substitui o cache em memória.
+    
+    O journal é aplicado e o cache trocado sob `atualizacao_lock`: um PATCH
+    concorrente ou entra no journal antes (e é aplicado aqui) ou é aplicado
+    depois, já sobre as cotas novas.
+    """
+    cotas = ler_planilha()
+    with atualizacao_lock:
+        journal.aplicar(cotas)
+        cache.set(cotas)
+    return cotas
+
+def carregar_cache_em_background():
+    """Carrega o cache em memória em uma thread, se nenhuma carga estiver em andamento."""
+    if not cache_recarga_lock.acquire(blocking=False):
+        return
+    
+    def _executar():
+        try:
+            recarregar_cache()
+        except Exception as e:
+            print(f"❌ ERRO na carga do cache em background: {str(e)}")
+        finally:
+            cache_recarga_lock.release()
+    
+    threading.Thread(target=_executar, name="carga-cache", daemon=True).start()
+
+def verificar_token(token: Optional[str]):
+    """
+    Exige o API_TOKEN configurado para endpoints de escrita.
+    
+    Raises:
+        HTTPException: 403 se API_TOKEN não estiver configurado,
+                       401 se o token informado for inválido
+    """
+    if API_TOKEN is None:
+        raise HTTPException(
+            status_code=403,
+            detail="Escrita desabilitada: defina a variável de ambiente API_TOKEN no servidor"
+        )
+    
+    if token is None or not secrets.compare_digest(token.encode(), API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token inválido ou ausente (header X-API-Token)")
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -281,12 +981,17 @@ async def root():
         "endpoints": {
             "GET /cotas": "Retorna todas as cotas disponíveis",
             "GET /cotas?status=disponivel": "Filtrar por status",
+            "PATCH /cotas/status": "Atualiza o status de várias cotas",
             "GET /status": "Status da API e informações de cache"
         }
     }
 
+# Os endpoints que leem a planilha ou o SQLite são funções síncronas: rodam
+# no threadpool do FastAPI, sem bloquear o event loop durante leituras,
+# consultas ou recargas.
+
 @app.get("/cotas", response_model=ResponseCotas)
-async def get_cotas(
+def get_cotas(
     status: Optional[str] = Query(None, description="Filtrar por status: 'disponivel' ou 'vendida'")
 ):
     """
@@ -302,23 +1007,29 @@ async def get_cotas(
         ResponseCotas com lista de cotas e total
     """
     try:
-        # Tentar usar cache
-        dados_cached = cache.get()
-        
-        if dados_cached is None:
-            # Cache expirado ou vazio, ler da planilha
-            cotas = ler_planilha()
-            cache.set(cotas)
-        else:
-            cotas = dados_cached
+        if status is not None:
+            status = status.lower().strip()
         
-        # Filtrar por status
-        if status is None:
-            # Padrão: retornar todas as cotas
-            cotas_filtradas = cotas
+        if storage is not None:
+            # Consulta indexada no SQLite
+            garantir_sqlite_atualizado()
+            cotas_filtradas = storage.listar(status)
         else:
-            status = status.lower().strip()
-            cotas_filtradas = [c for c in cotas if c.status == status]
+            # Tentar usar cache
+            dados_cached = cache.get()
+            
+            if dados_cached is None:
+                # Cache expirado ou vazio, ler da planilha
+                cotas = recarregar_cache()
+            else:
+                cotas = dados_cached
+            
+            # Filtrar por status
+            if status is None:
+                # Padrão: retornar todas as cotas
+                cotas_filtradas = cotas
+            else:
+                cotas_filtradas = [c for c in cotas if c.status == status]
         
         return ResponseCotas(
             total=len(cotas_filtradas),
@@ -334,7 +1045,7 @@ async def get_cotas(
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 @app.get("/cotas/{cota_id}")
-async def get_cota(cota_id: str):
+def get_cota(cota_id: str):
     """
     Retorna detalhes de uma cota específica pelo ID.
     
@@ -345,54 +1056,158 @@ async def get_cota(cota_id: str):
         Objeto Cota ou erro 404
     """
     try:
-        dados_cached = cache.get()
-        
-        if dados_cached is None:
-            cotas = ler_planilha()
-            cache.set(cotas)
+        if storage is not None:
+            garantir_sqlite_atualizado()
+            cota = storage.buscar(cota_id)
         else:
-            cotas = dados_cached
-        
-        cota = next((c for c in cotas if c.id == cota_id), None)
+            dados_cached = cache.get()
+            
+            if dados_cached is None:
+                cotas = recarregar_cache()
+            else:
+                cotas = dados_cached
+            
+            cota = next((c for c in cotas if c.id == cota_id), None)
         
         if cota is None:
             raise HTTPException(status_code=404, detail=f"Cota com ID '{cota_id}' não encontrada")
         
         return cota
     
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@app.patch("/cotas/status", response_model=ResponseAtualizacaoStatus)
+def atualizar_status_cotas(
+    atualizacoes: List[AtualizacaoStatus],
+    x_api_token: Optional[str] = Header(None, description="Token configurado em API_TOKEN")
+):
+    """
+    Atualiza o status de várias cotas de uma vez.
+    
+    As atualizações valem imediatamente para a API e são registradas em um
+    journal; a gravação na planilha acontece em background, em lote.
+    Exige o header X-API-Token. Sem API_TOKEN no servidor, responde 403.
+    
+    Nunca lê a planilha: os IDs são conferidos no catálogo já carregado
+    (no modo memória, mesmo com o TTL vencido; a próxima leitura o renova).
+    Se o catálogo ainda não foi carregado, responde 503 e inicia a carga.
+    
+    Função síncrona de propósito: o fsync do journal e a escrita no SQLite
+    rodam no threadpool, sem bloquear o event loop.
+    
+    Body:
+        Lista de objetos {"id": ..., "status": "disponivel" | "vendida"}
+    
+    Returns:
+        Quantidade de cotas atualizadas e IDs não encontrados
+    """
+    verificar_token(x_api_token)
+    
+    try:
+        # Consolidar por ID (a última atualização vence)
+        solicitadas = {a.id: a.status for a in atualizacoes}
+        
+        if storage is not None and not storage.carregado():
+            recarregar_sqlite_em_background()
+            raise HTTPException(
+                status_code=503,
+                detail="Catálogo ainda não carregado; tente novamente em instantes"
+            )
+        elif storage is not None:
+            # Com o banco já carregado, mudanças na planilha só disparam recarga em background
+            garantir_sqlite_atualizado()
+        elif cache.data is None:
+            carregar_cache_em_background()
+            raise HTTPException(
+                status_code=503,
+                detail="Catálogo ainda não carregado; tente novamente em instantes"
+            )
+        
+        with atualizacao_lock:
+            if storage is not None:
+                existentes = storage.existentes(list(solicitadas))
+            else:
+                existentes = {cota_id for cota_id in solicitadas if cota_id in cache.indice}
+            
+            validas = {cota_id: status for cota_id, status in solicitadas.items() if cota_id in existentes}
+            
+            if validas:
+                # Durabilidade primeiro: só aplica depois de gravar no journal
+                journal.registrar(validas)
+                
+                if storage is not None:
+                    storage.atualizar_status(validas)
+                else:
+                    for cota_id, status in validas.items():
+                        for cota in cache.indice[cota_id]:
+                            cota.status = status
+        
+        return ResponseAtualizacaoStatus(
+            atualizadas=len(validas),
+            nao_encontradas=[cota_id for cota_id in solicitadas if cota_id not in existentes],
+            pendentes_gravacao=len(journal.pendentes),
+            timestamp=datetime.now().isoformat()
+        )
+    
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 @app.post("/reload-cache")
-async def reload_cache():
+def reload_cache():
     """
     Força o recarregamento do cache (lê a planilha novamente).
     Útil após editar a planilha.
+    
+    Com SQLite, a recarga roda em background e as consultas seguem com os
+    dados anteriores até ela terminar.
     """
     try:
-        cache.clear()
-        cotas = ler_planilha()
-        cache.set(cotas)
+        if storage is not None:
+            iniciada = recarregar_sqlite_em_background(forcar=True)
+            mensagem = "Recarga iniciada em background" if iniciada else "Recarga já em andamento"
+            total_cotas = storage.total()
+        else:
+            cotas = recarregar_cache()
+            mensagem = "Cache recarregado"
+            total_cotas = len(cotas)
         
         return {
             "status": "sucesso",
-            "mensagem": "Cache recarregado",
-            "total_cotas": len(cotas),
+            "mensagem": mensagem,
+            "total_cotas": total_cotas,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao recarregar: {str(e)}")
 
 @app.get("/status")
-async def get_status():
-    """Retorna status da API e informações de cache."""
-    cache_valido = cache.is_valid()
+def get_status():
+    """Retorna status da API e informações de cache (ou do banco SQLite)."""
+    resposta = {"status": "online"}
     
-    return {
-        "status": "online",
-        "cache": {
+    if storage is not None:
+        # O cache em memória não é usado com SQLite
+        resposta["armazenamento"] = {
+            "backend": "sqlite",
+            "arquivo": str(ARQUIVO_SQLITE),
+            "total_cotas": storage.total(),
+            "ultima_atualizacao": storage.last_update.isoformat() if storage.last_update else None,
+            "recarga_em_andamento": storage.recarga_lock.locked()
+        }
+    else:
+        cache_valido = cache.is_valid()
+        resposta["cache"] = {
             "ativo": cache_valido,
             "duracao_segundos": CACHE_DURATION_SECONDS,
             "ultima_atualizacao": cache.last_update.isoformat() if cache.last_update else None,
@@ -400,6 +1215,15 @@ async def get_status():
                 int((cache.last_update + timedelta(seconds=CACHE_DURATION_SECONDS) - datetime.now()).total_seconds())
                 if cache_valido else 0
             )
+        }
+        resposta["armazenamento"] = {"backend": "memoria"}
+    
+    return {
+        **resposta,
+        "journal_status": {
+            "arquivo": str(ARQUIVO_JOURNAL),
+            "pendentes_gravacao": len(journal.pendentes),
+            "intervalo_gravacao_segundos": WRITEBACK_INTERVAL_SECONDS
         },
         "arquivo_dados": str(ARQUIVO_PLANILHA),
         "arquivo_existe": ARQUIVO_PLANILHA.exists(),
@@ -423,9 +1247,16 @@ if __name__ == "__main__":
     
     # Tentar ler a planilha na inicialização
     try:
-        cotas = ler_planilha()
-        cache.set(cotas)
-        print(f"✅ Inicialização bem-sucedida com {len(cotas)} cotas")
+        if storage is not None:
+            print(f"🗄️  Armazenamento: SQLite em {ARQUIVO_SQLITE}")
+            if storage.carregado():
+                print(f"✅ Banco existente com {storage.total()} cotas (recarga em background)")
+            else:
+                sincronizar_sqlite()
+                print(f"✅ Inicialização bem-sucedida com {storage.total()} cotas")
+        else:
+            cotas = recarregar_cache()
+            print(f"✅ Inicialização bem-sucedida com {len(cotas)} cotas")
     except FileNotFoundError:
         print("⚠️  AVISO: Planilha não encontrada. Crie 'cotas.xlsx' em ./dados/")
     except Exception as e: